@@ -2,36 +2,148 @@
 Reinforcement Learning-based Regional Agents
 """
 import numpy as np
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Optional
 from collections import deque
-import random
+from itertools import islice
+from app.core.jit import njit
+from app.core.resources import RegionState
+
+
+@njit(cache=True, fastmath=True)
+def compute_features(water, food, energy, land, population, development_level,
+                     stability, temperature, rainfall, disaster_risk,
+                     num_partners, growth_rate, state):
+    """Normalize raw region features into the float32[12] buffer `state`, clipped in place"""
+    state[0] = water / 2000.0            # 0: normalized water
+    state[1] = food / 2000.0             # 1: normalized food
+    state[2] = energy / 2000.0           # 2: normalized energy
+    state[3] = land / 1000.0             # 3: normalized land
+    state[4] = population / 1000.0       # 4: normalized population
+    state[5] = development_level         # 5: dev level (0-1)
+    state[6] = stability                 # 6: stability (0-1)
+    state[7] = temperature / 50.0        # 7: normalized temp
+    state[8] = rainfall / 200.0          # 8: normalized rainfall
+    state[9] = disaster_risk             # 9: disaster risk
+    state[10] = num_partners / 10.0      # 10: normalized trade partners
+    state[11] = growth_rate * 100        # 11: growth rate
+    for i in range(12):
+        state[i] = min(max(state[i], 0.0), 1.0)
+    return state
+
+
+class ReplayBuffer:
+    """Replay memory: a preallocated ring buffer, one contiguous array per field
+
+    Each transition is tagged with the Q-table row it belongs to, so one
+    buffer can pool experience across regions sharing an (N, A) table.
+    """
+
+    def __init__(self, capacity: int, state_size: int = 12):
+        self.capacity = capacity
+        self.rows = np.zeros(capacity, dtype=np.int32)
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int32)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.bool_)
+        # Precomputed next-state sums used by the Q approximation in q_update
+        self.next_state_sums = np.zeros(capacity, dtype=np.float32)
+        self.ptr = 0  # Next slot to write
+        self.size = 0  # Number of filled slots
+
+    def __len__(self) -> int:
+        return self.size
+
+    def add(self, state: np.ndarray, action: int, reward: float,
+            next_state: np.ndarray, done: bool, row: int = 0):
+        """Append one transition, overwriting the oldest once full"""
+        self.rows[self.ptr] = row
+        self.states[self.ptr] = state
+        self.actions[self.ptr] = action
+        self.rewards[self.ptr] = reward
+        self.next_states[self.ptr] = next_state
+        self.dones[self.ptr] = done
+        self.next_state_sums[self.ptr] = next_state.sum()
+        self.ptr = (self.ptr + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, rows: np.ndarray, states: np.ndarray, actions: np.ndarray,
+               rewards: np.ndarray, next_states: np.ndarray, dones: np.ndarray):
+        """Append a batch of transitions, overwriting the oldest once full"""
+        slots = (self.ptr + np.arange(len(rows))) % self.capacity
+        self.rows[slots] = rows
+        self.states[slots] = states
+        self.next_states[slots] = next_states
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.dones[slots] = dones
+        self.next_state_sums[slots] = next_states.sum(axis=1)
+        self.ptr = int(slots[-1] + 1) % self.capacity
+        self.size = min(self.size + len(rows), self.capacity)
+
+    def sample(self, batch_size: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+        """Indices of a uniformly drawn minibatch (with replacement)"""
+        if rng is None:
+            return np.random.randint(0, self.size, batch_size)
+        return rng.integers(0, self.size, batch_size)
+
+
+def q_update(q_table: np.ndarray, buffer: ReplayBuffer, idx: np.ndarray,
+             gamma: float, learning_rate: float) -> float:
+    """One minibatch Bellman update of `q_table` in place; returns the mean absolute TD error
+    
+    `q_table` is a single agent's (A,) values or an (N, A) table indexed by
+    the buffer's row tags; `idx` selects the minibatch from `buffer`.
+    """
+    q = q_table.reshape(-1, q_table.shape[-1])  # View: an (A,) table becomes (1, A)
+    rows = buffer.rows[idx]
+    actions = buffer.actions[idx]
+    
+    # max_a(q + c) == max(q) + c, so only the stored next-state sums are needed
+    next_q = q[rows].max(axis=1) + buffer.next_state_sums[idx] * 0.1
+    targets = buffer.rewards[idx] + gamma * next_q * ~buffer.dones[idx]
+    
+    old_q = q[rows, actions]
+    np.add.at(q, (rows, actions), learning_rate * (targets - old_q))
+    return float(np.abs(targets - old_q).mean())
+
 
 class DQNAgent:
     """Simple Q-Learning Agent for regional agent decision making"""
     
-    def __init__(self, state_size: int = 12, action_size: int = 9, learning_rate: float = 0.01):
+    def __init__(self, state_size: int = 12, action_size: int = 9, learning_rate: float = 0.01,
+                 memory_size: int = 2000, q_values: Optional[np.ndarray] = None,
+                 gamma: float = 0.95):
         self.state_size = state_size
         self.action_size = action_size
         self.learning_rate = learning_rate
-        self.gamma = 0.95  # Discount factor
+        self.gamma = gamma  # Discount factor
         self.epsilon = 1.0  # Exploration rate
         self.epsilon_decay = 0.995
         self.epsilon_min = 0.01
         
-        # Q-table (simplified): use random weights for approximation
-        self.q_values = np.random.randn(action_size) * 0.01
-        self.memory = deque(maxlen=2000)
-        self.loss_history = []
+        # Q-table (simplified): use random weights for approximation.
+        # A caller may pass a row view of a shared (N, A) table instead.
+        if q_values is None:
+            q_values = (np.random.randn(action_size) * 0.01).astype(np.float32)
+        self.q_values = q_values
+        
+        # memory_size=0 means no private memory (e.g. replay lives in a shared ReplayBuffer)
+        self.memory = ReplayBuffer(memory_size, state_size)
+        self.loss_history = deque(maxlen=1000)  # Recent losses only; bounded for long runs
     
     def remember(self, state: np.ndarray, action: int, reward: float, 
                  next_state: np.ndarray, done: bool):
         """Store experience in replay memory"""
-        self.memory.append((state, action, reward, next_state, done))
+        if self.memory.capacity == 0:
+            return
+        assert state.dtype == np.float32, "states must be float32 to avoid upcasting"
+        self.memory.add(state, action, reward, next_state, done)
     
     def act(self, state: np.ndarray, training: bool = True) -> int:
         """Select action using epsilon-greedy policy"""
         if training and np.random.random() < self.epsilon:
-            return random.randint(0, self.action_size - 1)
+            return np.random.randint(0, self.action_size)
         
         # Use state-action approximation
         q_estimates = self.q_values + np.sum(state) * 0.1
@@ -42,29 +154,39 @@ class DQNAgent:
         if len(self.memory) < batch_size:
             return 0.0
         
-        batch = random.sample(self.memory, batch_size)
-        
-        total_loss = 0.0
-        for state, action, reward, next_state, done in batch:
-            if done:
-                target = reward
-            else:
-                next_q = np.max(self.q_values + np.sum(next_state) * 0.1)
-                target = reward + self.gamma * next_q
-            
-
-            old_q = self.q_values[action]
-            self.q_values[action] += self.learning_rate * (target - old_q)
-            loss = abs(target - old_q)
-            total_loss += loss
-        
-        avg_loss = total_loss / batch_size
+        idx = self.memory.sample(batch_size)
+        avg_loss = q_update(self.q_values, self.memory, idx, self.gamma, self.learning_rate)
         self.loss_history.append(avg_loss)
         
-        if self.epsilon > self.epsilon_min:
-            self.epsilon *= self.epsilon_decay
+        self.decay_epsilon()
         
         return avg_loss
+    
+    def decay_epsilon(self):
+        """Decay exploration rate towards epsilon_min"""
+        if self.epsilon > self.epsilon_min:
+            self.epsilon *= self.epsilon_decay
+
+
+def select_actions(q_table: np.ndarray, epsilons: np.ndarray, states: np.ndarray,
+                   training: bool = True, explore_draws: Optional[np.ndarray] = None,
+                   random_actions: Optional[np.ndarray] = None) -> np.ndarray:
+    """Epsilon-greedy actions for N agents from their (N, A) Q-table rows and (N, S) states
+    
+    Callers that pre-draw their randomness pass the (N,) uniforms for the
+    exploration test and the (N,) random actions; otherwise they are drawn here.
+    """
+    q_estimates = q_table + states.sum(axis=1, keepdims=True) * 0.1
+    greedy = q_estimates.argmax(axis=1)
+    if not training:
+        return greedy
+    
+    n = states.shape[0]
+    if explore_draws is None:
+        explore_draws = np.random.random(n)
+    if random_actions is None:
+        random_actions = np.random.randint(0, q_table.shape[1], n)
+    return np.where(explore_draws < epsilons, random_actions, greedy)
 
 
 class RegionalAgent:
@@ -83,72 +205,95 @@ class RegionalAgent:
         8: {'name': 'Do Nothing', 'passive': True}
     }
     
+    # Typed view of ACTIONS: row = action id, columns follow EFFECT_COLUMNS.
+    # float64 so growth/pop/dev deltas reach the float64 region arrays unrounded
+    EFFECT_COLUMNS = ('water', 'food', 'energy', 'growth', 'pop_growth', 'dev_increase')
+    ACTION_EFFECTS = np.array([
+        [a.get('water', 0), a.get('food', 0), a.get('energy', 0),
+         a.get('growth', 0), a.get('pop_growth', 0), a.get('dev_increase', 0)]
+        for a in ACTIONS.values()
+    ], dtype=np.float64)
+    ACTION_NAMES: List[str] = [a['name'] for a in ACTIONS.values()]
+    
+    HISTORY_SIZE = 10_000  # Per-agent cap on the recent action/reward history
+    
     def __init__(self, region_id: str, dqn_agent: DQNAgent):
         self.region_id = region_id
         self.dqn = dqn_agent
-        self.action_history: List[int] = []
-        self.reward_history: List[float] = []
+        # Recent history only; lifetime aggregates are kept in the counters below
+        self.action_history: deque = deque(maxlen=self.HISTORY_SIZE)
+        self.reward_history: deque = deque(maxlen=self.HISTORY_SIZE)
         self.episode_steps = 0
         
+        # Running aggregates over every learning step
+        self.action_counts = np.zeros(len(self.ACTIONS), dtype=np.int64)
+        self.reward_sum = 0.0
+        self.reward_count = 0
+        self._state_buf = np.empty(12, dtype=np.float32)  # Reused by get_state_vector/observe
+        
     def get_state_vector(self, region_state: Dict[str, Any]) -> np.ndarray:
-        """Convert region state to normalized state vector for RL"""
+        """Convert region state to normalized state vector for RL
+        
+        Returns the agent's reusable buffer; copy it before holding on to it.
+        """
         resources = region_state['resources']
-        env_state = np.array([
-            resources['water'] / 2000.0,      # 0: normalized water
-            resources['food'] / 2000.0,       # 1: normalized food
-            resources['energy'] / 2000.0,     # 2: normalized energy
-            resources['land'] / 1000.0,       # 3: normalized land
-            region_state['population'] / 1000.0,  # 4: normalized population
-            region_state['development_level'],    # 5: dev level (0-1)
-            region_state['stability'],            # 6: stability (0-1)
-            region_state['temperature'] / 50.0,   # 7: normalized temp
-            region_state['rainfall'] / 200.0,     # 8: normalized rainfall
-            region_state['disaster_risk'],        # 9: disaster risk
-            len(region_state['trade_partners']) / 10.0,  # 10: normalized trade partners
-            region_state['growth_rate'] * 100  # 11: growth rate
-        ], dtype=np.float32)
+        return compute_features(
+            resources['water'], resources['food'], resources['energy'], resources['land'],
+            region_state['population'], region_state['development_level'],
+            region_state['stability'], region_state['temperature'],
+            region_state['rainfall'], region_state['disaster_risk'],
+            len(region_state['trade_partners']), region_state['growth_rate'],
+            self._state_buf
+        )
+    
+    def observe(self, region: RegionState, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """State vector read straight from a RegionState, skipping the dict round-trip
         
-        return np.clip(env_state, 0, 1)
+        Writes into `out` (e.g. a row of a batch state matrix) when given,
+        otherwise into the same reusable buffer as get_state_vector.
+        """
+        if out is None:
+            out = self._state_buf
+        resources = region.resources
+        return compute_features(
+            resources.water, resources.food, resources.energy, resources.land,
+            region.population, region.development_level, region.stability,
+            region.temperature, region.rainfall, region.disaster_risk,
+            len(region.trade_partners), region.growth_rate, out
+        )
     
     def decide_action(self, region_state: Dict[str, Any], training: bool = True) -> Tuple[int, str]:
         """Use RL to decide action"""
         state_vec = self.get_state_vector(region_state)
         action_idx = self.dqn.act(state_vec, training=training)
-        action_name = self.ACTIONS[action_idx]['name']
+        action_name = self.ACTION_NAMES[action_idx]
         return action_idx, action_name
     
-    def calculate_reward(self, prev_resources: Dict, curr_resources: Dict, 
-                       stability: float, population: int) -> float:
-        """Calculate reward based on state change"""
-        # Resource balance reward
-        resource_health = (
-            (curr_resources['water'] / 2000.0) +
-            (curr_resources['food'] / 2000.0) +
-            (curr_resources['energy'] / 2000.0)
-        ) / 3.0
-        
-        # Stability reward
-        stability_reward = stability * 2
-        
-        # Population growth reward
-        pop_reward = min(population / 500.0, 1.0) * 0.5
-        
-        # Prevent starvation penalty
-        starvation_penalty = 0
-        if curr_resources['food'] < 100:
-            starvation_penalty = -5
-        if curr_resources['energy'] < 100:
-            starvation_penalty -= 3
-        
-        total_reward = (resource_health * 3 + stability_reward + pop_reward + starvation_penalty)
-        return float(np.clip(total_reward, -10, 10))
+    def get_recent_actions(self, n: int = 5) -> List[str]:
+        """Names of the last n actions taken, oldest first"""
+        recent = list(islice(reversed(self.action_history), n))
+        return [self.ACTION_NAMES[a] for a in reversed(recent)]
+    
+    def get_average_reward(self) -> float:
+        """Mean reward over all learning steps, from the running sum"""
+        return self.reward_sum / max(self.reward_count, 1)
     
     def learn(self, state: np.ndarray, action: int, reward: float, 
-              next_state: np.ndarray, done: bool):
-        """Learn from experience"""
-        self.dqn.remember(state, action, reward, next_state, done)
+              next_state: np.ndarray, done: bool, replay: bool = True):
+        """Learn from experience
+        
+        With replay=False the experience is only recorded; the caller is
+        responsible for updating the Q-values (see WorldSimulation.step).
+        """
         self.reward_history.append(reward)
         self.action_history.append(action)
+        self.action_counts[action] += 1
+        self.reward_sum += reward
+        self.reward_count += 1
         
+        if not replay:
+            return 0.0
+        
+        self.dqn.remember(state, action, reward, next_state, done)
         loss = self.dqn.replay(batch_size=32)
         return loss
@@ -1,17 +1,39 @@
 """
 FastAPI Routes for WorldSim
 """
-from fastapi import APIRouter, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+import orjson
+from app.simulation.engine import recent_items
 
 router = APIRouter()
 
 # Global simulation instance (will be set in main.py)
 simulation = None
 
+# Serializes /simulation/step; created on startup so it binds to the server's loop
+_step_lock: Optional[asyncio.Lock] = None
+
+# Encoded JSON bodies memoized per (simulation, cycle)
+_response_cache: Dict[str, Tuple[Any, int, bytes]] = {}
+
+def _cached_json(key: str, build: Callable[[], Any]) -> Response:
+    """Serialize build() once per simulation cycle and reuse the encoded body"""
+    cached = _response_cache.get(key)
+    if cached is None or cached[0] is not simulation or cached[1] != simulation.current_cycle:
+        body = orjson.dumps(build(), option=orjson.OPT_SERIALIZE_NUMPY)
+        cached = (simulation, simulation.current_cycle, body)
+        _response_cache[key] = cached
+    return Response(content=cached[2], media_type="application/json")
+
 @router.on_event("startup")
 async def startup_event():
     """Initialize simulation on startup"""
-    global simulation
+    global simulation, _step_lock
+    _step_lock = asyncio.Lock()
     if simulation is None:
         from app.simulation.engine import WorldSimulation
         simulation = WorldSimulation(num_regions=6)
@@ -32,8 +54,10 @@ async def step_simulation():
         raise HTTPException(status_code=500, detail="Simulation not initialized")
     
     try:
-        cycle_data = simulation.step()
-        return cycle_data
+        # Off the event loop so other requests keep being served during the tick
+        async with _step_lock:
+            cycle_data = await asyncio.to_thread(simulation.step)
+        return ORJSONResponse(cycle_data)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -43,7 +67,7 @@ async def get_world_state():
     if simulation is None:
         raise HTTPException(status_code=500, detail="Simulation not initialized")
     
-    return simulation.get_world_state()
+    return _cached_json('state', simulation.get_world_state)
 
 @router.get("/simulation/statistics")
 async def get_statistics():
@@ -51,7 +75,7 @@ async def get_statistics():
     if simulation is None:
         raise HTTPException(status_code=500, detail="Simulation not initialized")
     
-    return simulation.get_statistics()
+    return _cached_json('statistics', simulation.get_statistics)
 
 @router.get("/simulation/history")
 async def get_cycle_history(limit: int = Query(50, le=500)):
@@ -59,10 +83,11 @@ async def get_cycle_history(limit: int = Query(50, le=500)):
     if simulation is None:
         raise HTTPException(status_code=500, detail="Simulation not initialized")
     
-    return {
-        'cycles': simulation.cycle_history[-limit:],
-        'total_cycles': len(simulation.cycle_history)
-    }
+    # Returned as a Response so the payload skips FastAPI's Python-side encoder
+    return ORJSONResponse({
+        'cycles': recent_items(simulation.cycle_history, limit),
+        'total_cycles': simulation.current_cycle
+    })
 
 @router.get("/regions")
 async def get_regions():
@@ -70,10 +95,7 @@ async def get_regions():
     if simulation is None:
         raise HTTPException(status_code=500, detail="Simulation not initialized")
     
-    return {
-        rid: region.get_state_dict() 
-        for rid, region in simulation.regions.items()
-    }
+    return _cached_json('regions', simulation.get_regions)
 
 @router.get("/regions/{region_id}")
 async def get_region(region_id: str):
@@ -87,15 +109,15 @@ async def get_region(region_id: str):
     region = simulation.regions[region_id]
     agent = simulation.agents[region_id]
     
-    return {
+    return ORJSONResponse({
         'region': region.get_state_dict(),
         'agent_stats': {
-            'actions_taken': len(agent.action_history),
-            'avg_reward': float(sum(agent.reward_history) / len(agent.reward_history)) if agent.reward_history else 0,
-            'recent_actions': [agent.ACTIONS[a]['name'] for a in agent.action_history[-5:]],
+            'actions_taken': agent.reward_count,
+            'avg_reward': agent.get_average_reward(),
+            'recent_actions': agent.get_recent_actions(5),
             'epsilon': float(agent.dqn.epsilon)
         }
-    }
+    })
 
 @router.get("/trade-network")
 async def get_trade_network():
@@ -103,14 +125,11 @@ async def get_trade_network():
     if simulation is None:
         raise HTTPException(status_code=500, detail="Simulation not initialized")
     
-    return {
+    return ORJSONResponse({
         'nodes': list(simulation.regions.keys()),
-        'edges': [
-            {'source': u, 'target': v, 'weight': data.get('weight', 0.5)}
-            for u, v, data in simulation.trade_network.trade_graph.edges(data=True)
-        ],
-        'recent_trades': simulation.trade_network.trade_history[-20:]
-    }
+        'edges': simulation.trade_network.edges(),
+        'recent_trades': recent_items(simulation.trade_network.trade_history, 20)
+    })
 
 @router.get("/events")
 async def get_events(limit: int = Query(50, le=1000)):
@@ -118,19 +137,11 @@ async def get_events(limit: int = Query(50, le=1000)):
     if simulation is None:
         raise HTTPException(status_code=500, detail="Simulation not initialized")
     
-    events = simulation.event_history[-limit:]
-    return {
+    events = recent_items(simulation.event_history, limit)
+    return ORJSONResponse({
         'count': len(events),
-        'events': [
-            {
-                'type': event.event_type,
-                'affected_regions': event.affected_regions,
-                'severity': event.severity,
-                'timestamp': event.timestamp.isoformat()
-            }
-            for event in events
-        ]
-    }
+        'events': [event.to_dict() for event in events]
+    })
 
 @router.post("/simulation/reset")
 async def reset_simulation():
@@ -156,14 +167,10 @@ async def get_analysis():
     for region_id, region in simulation.regions.items():
         agent = simulation.agents[region_id]
         
-        # Strategy analysis
-        action_counts = {}
-        for action in agent.action_history:
-            action_name = agent.ACTIONS[action]['name']
-            action_counts[action_name] = action_counts.get(action_name, 0) + 1
-        
-        # Sort by frequency
-        top_actions = sorted(action_counts.items(), key=lambda x: x[1], reverse=True)[:3]
+        # Strategy analysis: top 3 actions by frequency from the running counts
+        counts = agent.action_counts
+        top_actions = np.argpartition(-counts, 3)[:3]
+        top_actions = top_actions[np.argsort(-counts[top_actions], kind='stable')]
         
         analysis['regions'][region_id] = {
             'name': region.name,
@@ -171,26 +178,30 @@ async def get_analysis():
             'population': region.population,
             'development': region.development_level,
             'stability': region.stability,
-            'total_actions': len(agent.action_history),
-            'top_strategies': [{'action': a, 'frequency': f} for a, f in top_actions],
+            'total_actions': agent.reward_count,
+            'top_strategies': [
+                {'action': agent.ACTION_NAMES[a], 'frequency': int(counts[a])}
+                for a in top_actions if counts[a] > 0
+            ],
             'learning_progress': float(agent.dqn.epsilon),
-            'avg_reward': float(sum(agent.reward_history) / len(agent.reward_history)) if agent.reward_history else 0
+            'avg_reward': agent.get_average_reward()
         }
     
     # Global sustainability
     total_pop = sum(r.population for r in simulation.regions.values())
+    resources = simulation.resources
     avg_resources = {
-        'water': sum(r.resources.water for r in simulation.regions.values()) / simulation.num_regions,
-        'food': sum(r.resources.food for r in simulation.regions.values()) / simulation.num_regions,
-        'energy': sum(r.resources.energy for r in simulation.regions.values()) / simulation.num_regions,
+        'water': float(resources.water.mean()),
+        'food': float(resources.food.mean()),
+        'energy': float(resources.energy.mean()),
     }
     
     analysis['sustainability_metrics'] = {
         'total_population': total_pop,
         'avg_resources': avg_resources,
-        'collapsed_regions': sum(1 for r in simulation.regions.values() if r.is_critical()),
-        'trade_intensity': simulation.trade_network.trade_graph.number_of_edges() / (simulation.num_regions * 2),
-        'events_total': len(simulation.event_history)
+        'collapsed_regions': int(resources.critical_mask().sum()),
+        'trade_intensity': simulation.trade_network.num_edges() / (simulation.num_regions * 2),
+        'events_total': simulation.events_total
     }
     
-    return analysis
+    return ORJSONResponse(analysis)
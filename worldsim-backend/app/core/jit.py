@@ -0,0 +1,14 @@
+"""
+Optional Numba JIT support
+"""
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # Numba not installed: run kernels as plain Python
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
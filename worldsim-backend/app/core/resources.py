@@ -1,30 +1,96 @@
 """
 Resource Pool and Management
 """
-from dataclasses import dataclass, field
-from typing import Dict
+from typing import Dict, Optional
 import numpy as np
 
-@dataclass
+class ResourceArrays:
+    """Resources of all regions, one contiguous array per resource (structure of arrays)"""
+    
+    def __init__(self, num_regions: int, max_water: float = 2000.0, max_food: float = 2000.0,
+                 max_energy: float = 2000.0, max_land: float = 1000.0):
+        self.num_regions = num_regions
+        self.water = np.zeros(num_regions, dtype=np.float32)
+        self.food = np.zeros(num_regions, dtype=np.float32)
+        self.energy = np.zeros(num_regions, dtype=np.float32)
+        self.land = np.zeros(num_regions, dtype=np.float32)
+        
+        # Maximum capacity constraints
+        self.max_water = max_water
+        self.max_food = max_food
+        self.max_energy = max_energy
+        self.max_land = max_land
+    
+    def critical_mask(self) -> np.ndarray:
+        """Boolean mask of regions with any resource critically low"""
+        return (self.water < 100) | (self.food < 100) | (self.energy < 100)
+
+
+class _ArrayField:
+    """Reads/writes one attribute of a view object through its backing arrays"""
+    
+    def __init__(self, cast=float):
+        self.cast = cast  # Python type handed out, so views stay JSON-friendly
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        return self.cast(getattr(view._arrays, self.name)[view._index])
+    
+    def __set__(self, view, value):
+        getattr(view._arrays, self.name)[view._index] = value
+
+
 class ResourcePool:
-    """Represents resources in a region"""
-    water: float = 1000.0
-    food: float = 1000.0
-    energy: float = 1000.0
-    land: float = 1000.0
-    
-    # Maximum capacity constraints
-    max_water: float = 2000.0
-    max_food: float = 2000.0
-    max_energy: float = 2000.0
-    max_land: float = 1000.0
-    
-    def __post_init__(self):
-        """Initialize with constraints"""
-        self.water = min(self.water, self.max_water)
-        self.food = min(self.food, self.max_food)
-        self.energy = min(self.energy, self.max_energy)
-        self.land = min(self.land, self.max_land)
+    """Represents resources in a region, as a view onto one slot of a ResourceArrays"""
+    
+    def __init__(self, water: float = 1000.0, food: float = 1000.0, energy: float = 1000.0,
+                 land: float = 1000.0, max_water: Optional[float] = None,
+                 max_food: Optional[float] = None, max_energy: Optional[float] = None,
+                 max_land: Optional[float] = None,
+                 arrays: Optional[ResourceArrays] = None, index: int = 0):
+        caps = {name: cap for name, cap in (('max_water', max_water), ('max_food', max_food),
+                                            ('max_energy', max_energy), ('max_land', max_land))
+                if cap is not None}
+        if arrays is None:
+            # Standalone pool: back it with a private single-region store
+            arrays = ResourceArrays(1, **caps)
+            index = 0
+        elif caps:
+            # Capacities are shared by every region in the store, so a view can't override them
+            raise ValueError(f"{', '.join(caps)} must be set on the ResourceArrays, not on a pool view")
+        self._arrays = arrays
+        self._index = index
+        
+        # Initialize with constraints
+        self.water = min(water, arrays.max_water)
+        self.food = min(food, arrays.max_food)
+        self.energy = min(energy, arrays.max_energy)
+        self.land = min(land, arrays.max_land)
+    
+    water = _ArrayField()
+    food = _ArrayField()
+    energy = _ArrayField()
+    land = _ArrayField()
+    
+    @property
+    def max_water(self) -> float:
+        return self._arrays.max_water
+    
+    @property
+    def max_food(self) -> float:
+        return self._arrays.max_food
+    
+    @property
+    def max_energy(self) -> float:
+        return self._arrays.max_energy
+    
+    @property
+    def max_land(self) -> float:
+        return self._arrays.max_land
     
     def get_as_dict(self) -> Dict[str, float]:
         """Convert to dictionary"""
@@ -58,22 +124,59 @@ class ResourcePool:
         return (self.water < 100 or self.food < 100 or self.energy < 100)
 
 
-@dataclass
+class RegionArrays:
+    """Per-region scalar attributes of all regions, one array per attribute"""
+    
+    def __init__(self, num_regions: int):
+        self.num_regions = num_regions
+        self.population = np.zeros(num_regions, dtype=np.int64)
+        self.development_level = np.zeros(num_regions)
+        self.growth_rate = np.zeros(num_regions)
+        self.stability = np.zeros(num_regions)
+        
+        # Environmental factors
+        self.temperature = np.zeros(num_regions)
+        self.rainfall = np.zeros(num_regions)
+        self.disaster_risk = np.zeros(num_regions)
+
+
 class RegionState:
-    """Complete state of a region"""
-    region_id: str
-    name: str
-    resources: ResourcePool = field(default_factory=ResourcePool)
-    population: int = 100
-    development_level: float = 0.5  # 0-1 scale
-    growth_rate: float = 0.02
-    stability: float = 0.8  # 0-1, affects agent decisions
-    trade_partners: Dict[str, float] = field(default_factory=dict)  # region_id -> trade_strength
+    """Complete state of a region, as a view onto one slot of a RegionArrays"""
+    
+    population = _ArrayField(int)
+    development_level = _ArrayField()  # 0-1 scale
+    growth_rate = _ArrayField()
+    stability = _ArrayField()  # 0-1, affects agent decisions
     
     # Environmental factors
-    temperature: float = 20.0  # Celsius
-    rainfall: float = 100.0  # mm/month
-    disaster_risk: float = 0.05  # Probability per cycle
+    temperature = _ArrayField()  # Celsius
+    rainfall = _ArrayField()  # mm/month
+    disaster_risk = _ArrayField()  # Probability per cycle
+    
+    def __init__(self, region_id: str, name: str, resources: Optional[ResourcePool] = None,
+                 population: int = 100, development_level: float = 0.5,
+                 growth_rate: float = 0.02, stability: float = 0.8,
+                 trade_partners: Optional[Dict[str, float]] = None,
+                 temperature: float = 20.0, rainfall: float = 100.0, disaster_risk: float = 0.05,
+                 arrays: Optional[RegionArrays] = None, index: int = 0):
+        if arrays is None:
+            # Standalone region: back it with a private single-region store
+            arrays = RegionArrays(1)
+            index = 0
+        self._arrays = arrays
+        self._index = index
+        
+        self.region_id = region_id
+        self.name = name
+        self.resources = resources if resources is not None else ResourcePool()
+        self.trade_partners = trade_partners if trade_partners is not None else {}  # region_id -> trade_strength
+        self.population = population
+        self.development_level = development_level
+        self.growth_rate = growth_rate
+        self.stability = stability
+        self.temperature = temperature
+        self.rainfall = rainfall
+        self.disaster_risk = disaster_risk
     
     def get_state_dict(self) -> Dict:
         """Get complete state as dictionary"""
@@ -90,3 +193,7 @@ class RegionState:
             'rainfall': self.rainfall,
             'disaster_risk': self.disaster_risk
         }
+    
+    def is_critical(self) -> bool:
+        """Check if the region is in a resource crisis"""
+        return self.resources.is_critical()
@@ -3,10 +3,17 @@ World Simulation Engine - Main orchestrator
 """
 import numpy as np
 from typing import Dict, List, Tuple, Any, Optional
-import networkx as nx
+from collections import deque
+from itertools import islice
 from datetime import datetime
-from app.core.resources import ResourcePool, RegionState
-from app.agents.rl_agent import RegionalAgent, DQNAgent
+from app.core.resources import RegionArrays, ResourceArrays, ResourcePool, RegionState
+from app.agents.rl_agent import RegionalAgent, DQNAgent, ReplayBuffer, q_update, select_actions
+from app.simulation.kernels import update_basic_resources_kernel, apply_actions, compute_rewards
+
+def recent_items(history: deque, n: int) -> List[Any]:
+    """Last `n` entries of a bounded history, oldest first"""
+    return list(islice(history, max(len(history) - n, 0), None))
+
 
 class ClimaticEvent:
     """Represents environmental events affecting world"""
@@ -20,97 +27,176 @@ class ClimaticEvent:
         'plague': {'population_loss': 0.1, 'description': 'Plague Outbreak'}
     }
     
-    def __init__(self, event_type: str, affected_regions: List[str], severity: float = 1.0):
+    # Typed view of EVENT_TYPES: columns follow EFFECT_COLUMNS, NaN = no effect
+    EFFECT_COLUMNS = ('water', 'food', 'energy', 'land', 'population_loss')
+    _EVENT_DELTAS: Dict[str, np.ndarray] = {
+        name: np.array([e.get('water', np.nan), e.get('food', np.nan), e.get('energy', np.nan),
+                        e.get('land', np.nan), e.get('population_loss', np.nan)])
+        for name, e in EVENT_TYPES.items()
+    }
+    
+    def __init__(self, event_type: str, affected_regions: List[str], severity: float = 1.0,
+                 affected_idx: Optional[np.ndarray] = None):
         self.event_type = event_type
         self.affected_regions = affected_regions
+        self.affected_idx = affected_idx  # Region-array rows of affected_regions, when known
         self.severity = severity
         self.timestamp = datetime.now()
+        self._iso = self.timestamp.isoformat()
+        self._dict: Optional[Dict[str, Any]] = None
     
-    def apply(self, region_state: RegionState) -> Dict[str, float]:
-        """Apply event to region"""
-        if region_state.region_id not in self.affected_regions:
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form of the event, built once (events never change)"""
+        if self._dict is None:
+            self._dict = {
+                'type': self.event_type,
+                'affected_regions': self.affected_regions,
+                'severity': self.severity,
+                'timestamp': self._iso
+            }
+        return self._dict
+    
+    def apply_vec(self, water: np.ndarray, food: np.ndarray, energy: np.ndarray,
+                  land: np.ndarray, population: np.ndarray, idx: np.ndarray) -> Dict[str, float]:
+        """Apply event to the affected regions (indices `idx`) of the region arrays, in place"""
+        deltas = self._EVENT_DELTAS.get(self.event_type)
+        if deltas is None or len(idx) == 0:
             return {}
         
-        event_data = self.EVENT_TYPES.get(self.event_type, {})
         effects = {}
+        for resource, arr, change in zip(self.EFFECT_COLUMNS, (water, food, energy, land), deltas[:4]):
+            if not np.isnan(change):
+                arr[idx] += change * self.severity
+                np.clip(arr, 0, None, out=arr)
+                effects[resource] = float(change * self.severity)
         
-        for resource, change in event_data.items():
-            if resource == 'population_loss':
-                region_state.population = int(region_state.population * (1 - change * self.severity))
-            elif hasattr(region_state.resources, resource):
-                current = getattr(region_state.resources, resource)
-                setattr(region_state.resources, resource, 
-                       max(0, current + change * self.severity))
-                effects[resource] = change * self.severity
+        population_loss = deltas[4]
+        if not np.isnan(population_loss):
+            population[idx] = (population[idx] * (1 - population_loss * self.severity)).astype(np.int64)
         
         return effects
 
 
 class TradeNetwork:
-    """Manages trade relationships between regions"""
+    """Manages trade relationships between regions
+    
+    Trade strengths live in a dense, symmetric (N, N) float32 matrix; a zero
+    entry means the two regions do not trade.
+    """
+    
+    HISTORY_SIZE = 1024  # Recent trades kept for the API
     
-    def __init__(self):
-        self.trade_graph = nx.DiGraph()
-        self.trade_history: List[Dict] = []
+    def __init__(self, num_regions: int):
+        self.trade_w = np.zeros((num_regions, num_regions), dtype=np.float32)
+        self.region_ids: List[str] = []
+        self.region_index: Dict[str, int] = {}
+        self.trade_history: deque = deque(maxlen=self.HISTORY_SIZE)
+        # Each trading pair once (i < j, row-major order) with its strength, rebuilt in establish_trade
+        self._trade_pairs = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))
+        self._pair_strengths = np.empty(0, dtype=np.float32)
     
     def add_region(self, region_id: str):
         """Add region to trade network"""
-        self.trade_graph.add_node(region_id)
+        self.region_index[region_id] = len(self.region_ids)
+        self.region_ids.append(region_id)
     
     def establish_trade(self, region_a: str, region_b: str, strength: float = 0.5):
         """Establish trade relationship"""
-        self.trade_graph.add_edge(region_a, region_b, weight=strength)
-        self.trade_graph.add_edge(region_b, region_a, weight=strength)
+        i, j = self.region_index[region_a], self.region_index[region_b]
+        self.trade_w[i, j] = self.trade_w[j, i] = strength
+        self._trade_pairs = np.nonzero(np.triu(self.trade_w, 1))
+        self._pair_strengths = self.trade_w[self._trade_pairs]
     
     def get_trading_partners(self, region_id: str) -> Dict[str, float]:
         """Get trading partners and strength"""
-        partners = {}
-        if region_id in self.trade_graph:
-            for neighbor in self.trade_graph.neighbors(region_id):
-                edge_data = self.trade_graph.get_edge_data(region_id, neighbor)
-                partners[neighbor] = edge_data.get('weight', 0.5)
-        return partners
+        if region_id not in self.region_index:
+            return {}
+        row = self.trade_w[self.region_index[region_id]]
+        return {self.region_ids[j]: float(row[j]) for j in np.flatnonzero(row)}
+    
+    def num_edges(self) -> int:
+        """Number of directed trade edges (each relationship counts both ways)"""
+        return int(np.count_nonzero(self.trade_w))
+    
+    def edges(self) -> List[Dict[str, Any]]:
+        """Directed trade edges re-derived from the nonzero strengths"""
+        sources, targets = np.nonzero(self.trade_w)
+        return [
+            {'source': self.region_ids[i], 'target': self.region_ids[j], 'weight': weight}
+            for i, j, weight in zip(sources.tolist(), targets.tolist(),
+                                    self.trade_w[sources, targets].tolist())
+        ]
     
-    def execute_trade(self, region_a_state: RegionState, region_b_state: RegionState,
-                     trade_strength: float = 0.5) -> Tuple[Dict, Dict]:
-        """Execute trade between regions"""
+    def execute_trades(self, resources: ResourceArrays, trade_mask: np.ndarray) -> int:
+        """Execute every trade selected by `trade_mask` (N, N) in one vectorized pass
+        
+        Only the upper triangle of the mask is used, so each relationship
+        trades at most once. Returns the number of trades executed.
+        """
+        pairs_a, pairs_b = self._trade_pairs
+        selected = trade_mask[pairs_a, pairs_b]
+        region_a, region_b = pairs_a[selected], pairs_b[selected]
+        strengths = self._pair_strengths[selected]
+        
         # Simplified trade: exchange surpluses
-        trade_amount = trade_strength * 50
+        trade_amount = strengths * 50
         
         # Region A gives food, gets energy
-        region_a_state.resources.food -= trade_amount
-        region_b_state.resources.energy -= trade_amount * 0.8  # Loss in transit
+        np.subtract.at(resources.food, region_a, trade_amount)
+        np.subtract.at(resources.energy, region_b, trade_amount * 0.8)  # Loss in transit
         
         # Region B gives energy, gets food
-        region_b_state.resources.energy += trade_amount * 0.9  # Profit
-        region_a_state.resources.food += trade_amount * 0.8
-        
-        trade_event = {
-            'region_a': region_a_state.region_id,
-            'region_b': region_b_state.region_id,
-            'strength': trade_strength,
-            'timestamp': datetime.now()
-        }
-        self.trade_history.append(trade_event)
+        np.add.at(resources.energy, region_b, trade_amount * 0.9)  # Profit
+        np.add.at(resources.food, region_a, trade_amount * 0.8)
         
-        return {}, {}
+        timestamp = datetime.now()
+        self.trade_history.extend(
+            {
+                'region_a': self.region_ids[i],
+                'region_b': self.region_ids[j],
+                'strength': strength,
+                'timestamp': timestamp
+            }
+            for i, j, strength in zip(region_a.tolist(), region_b.tolist(), strengths.tolist())
+        )
+        return len(region_a)
 
 
 class WorldSimulation:
     """Main simulation engine"""
     
+    HISTORY_SIZE = 1024  # Cycles/events/actions kept; older entries are evicted
+    
     def __init__(self, num_regions: int = 6, seed: int = 42):
-        np.random.seed(seed)
+        self.rng = np.random.default_rng(seed)  # Every random draw of the simulation goes through this
         self.num_regions = num_regions
         self.current_cycle = 0
         self.regions: Dict[str, RegionState] = {}
+        self._region_index: Dict[str, int] = {}  # region_id -> row in the region arrays
+        # Structure-of-arrays backing stores for every region's ResourcePool/RegionState
+        self.resources = ResourceArrays(num_regions)
+        self.region_arrays = RegionArrays(num_regions)
+        
+        # Shared Q-table: row i holds region i's action values, updated by one
+        # minibatch per cycle drawn from the replay buffer pooled across regions
+        self.gamma = 0.95
+        self.learning_rate = 0.01
+        self.batch_size = 32
+        self.q_table = (self.rng.standard_normal((num_regions, len(RegionalAgent.ACTIONS))) * 0.01).astype(np.float32)
+        self.replay_buffer = ReplayBuffer(capacity=2000 * num_regions, state_size=12)
+        self.state_mat = np.empty((num_regions, 12), dtype=np.float32)  # Batched agent observations
+        self.next_state_mat = np.empty_like(self.state_mat)  # The same, after actions are applied
+        self.rewards = np.empty(num_regions)  # Per-cycle rewards, filled by one kernel call
         self.agents: Dict[str, RegionalAgent] = {}
-        self.trade_network = TradeNetwork()
-        self.event_history: List[ClimaticEvent] = []
-        self.action_history: List[Dict] = []
-        self.cycle_history: List[Dict] = []
+        self.trade_network = TradeNetwork(num_regions)
+        self.event_history: deque = deque(maxlen=self.HISTORY_SIZE)
+        self.action_history: deque = deque(maxlen=self.HISTORY_SIZE)
+        self.cycle_history: deque = deque(maxlen=self.HISTORY_SIZE)
+        self.events_total = 0  # Lifetime count; event_history only keeps the recent ones
         
         self._initialize_world()
+        self._regions_snapshot: Dict[str, Dict] = {}
+        self._snapshot_regions()
     
     def _initialize_world(self):
         """Initialize world with regions and agents"""
@@ -128,27 +214,37 @@ class WorldSimulation:
                 region_id=region_id,
                 name=region_name,
                 resources=ResourcePool(
-                    water=np.random.uniform(800, 1200),
-                    food=np.random.uniform(800, 1200),
-                    energy=np.random.uniform(800, 1200),
-                    land=1000
+                    water=self.rng.uniform(800, 1200),
+                    food=self.rng.uniform(800, 1200),
+                    energy=self.rng.uniform(800, 1200),
+                    land=1000,
+                    arrays=self.resources,
+                    index=i
                 ),
-                population=np.random.randint(80, 120),
-                development_level=np.random.uniform(0.3, 0.7),
-                temperature=np.random.uniform(15, 25),
-                rainfall=np.random.uniform(80, 150)
+                population=int(self.rng.integers(80, 120)),
+                development_level=self.rng.uniform(0.3, 0.7),
+                temperature=self.rng.uniform(15, 25),
+                rainfall=self.rng.uniform(80, 150),
+                arrays=self.region_arrays,
+                index=i
             )
             
             self.regions[region_id] = region
+            self._region_index[region_id] = i
             
             # Create RL agent for region
-            dqn = DQNAgent(state_size=12, action_size=9)
+            # Replay lives in the shared buffer, so the agent keeps no memory of its own
+            dqn = DQNAgent(state_size=12, action_size=9, learning_rate=self.learning_rate,
+                           memory_size=0, q_values=self.q_table[i], gamma=self.gamma)
             agent = RegionalAgent(region_id, dqn)
             self.agents[region_id] = agent
             
             # Add to trade network
             self.trade_network.add_region(region_id)
         
+        # Region ids by row, for mapping sampled indices back to ids
+        self._region_ids_arr = np.array(list(self.regions))
+        
         # Establish initial trade relationships
         self._establish_initial_trades()
     
@@ -159,48 +255,109 @@ class WorldSimulation:
         for i, region_a in enumerate(regions_list):
             for j in range(i + 1, min(i + 3, len(regions_list))):
                 region_b = regions_list[j]
-                if np.random.random() > 0.3:  # 70% chance of trade
+                if self.rng.random() > 0.3:  # 70% chance of trade
                     self.trade_network.establish_trade(region_a, region_b, 
-                                                       strength=np.random.uniform(0.3, 0.8))
+                                                       strength=self.rng.uniform(0.3, 0.8))
     
-    def _generate_climatic_event(self) -> Optional[ClimaticEvent]:
-        """Randomly generate climatic events"""
-        if np.random.random() > 0.15:  # 15% chance per cycle
+    def _generate_climatic_event(self, draws: np.ndarray) -> Optional[ClimaticEvent]:
+        """Randomly generate climatic events
+        
+        `draws` holds this cycle's pre-drawn uniforms for the event gate,
+        the event type and the severity.
+        """
+        gate, type_draw, severity_draw = draws
+        if gate > 0.15:  # 15% chance per cycle
             return None
         
         event_types = list(ClimaticEvent.EVENT_TYPES.keys())
-        event_type = np.random.choice(event_types)
+        event_type = event_types[int(type_draw * len(event_types))]
         
-        num_affected = np.random.randint(1, max(2, self.num_regions // 2))
-        affected_regions = list(np.random.choice(
-            list(self.regions.keys()), size=num_affected, replace=False
-        ))
+        num_affected = int(self.rng.integers(1, max(2, self.num_regions // 2)))
+        affected_idx = self.rng.choice(self.num_regions, size=num_affected, replace=False)
+        affected_regions = self._region_ids_arr[affected_idx].tolist()
         
-        severity = np.random.uniform(0.5, 1.5)
-        return ClimaticEvent(event_type, affected_regions, severity)
+        severity = 0.5 + float(severity_draw)  # uniform(0.5, 1.5)
+        return ClimaticEvent(event_type, affected_regions, severity, affected_idx=affected_idx)
     
-    def _update_basic_resources(self, region: RegionState):
-        """Update region resources based on natural processes"""
-        # Natural precipitation/water generation
-        water_generation = region.rainfall * 5
-        region.resources.replenish(water=water_generation)
-        
-        # Food production based on development and land
-        food_production = region.development_level * region.population * 2
-        region.resources.replenish(food=food_production)
-        
-        # Energy consumption
-        energy_consumption = region.population * 5
-        region.resources.deplete(energy=energy_consumption)
-        
-        # Population changes
-        if region.resources.food > region.population * 8:
-            region.population = int(region.population * (1 + region.growth_rate))
-        elif region.resources.food < region.population * 3:
-            region.population = int(region.population * 0.98)
+    def _update_basic_resources(self):
+        """Update all regions' resources based on natural processes"""
+        resources, regions = self.resources, self.region_arrays
+        update_basic_resources_kernel(
+            resources.water, resources.food, resources.energy, resources.land,
+            regions.population, regions.development_level, regions.rainfall, regions.growth_rate,
+            resources.max_water, resources.max_food, resources.max_energy, resources.max_land
+        )
     
-    def step(self) -> Dict[str, Any]:
-        """Execute one simulation cycle"""
+    def _apply_actions(self, actions: np.ndarray):
+        """Apply every region's chosen action using the ACTION_EFFECTS table"""
+        resources, regions = self.resources, self.region_arrays
+        apply_actions(
+            resources.water, resources.food, resources.energy, regions.growth_rate,
+            regions.population, regions.development_level, actions,
+            RegionalAgent.ACTION_EFFECTS
+        )
+    
+    def _fill_state_matrix(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Write every region's normalized 12-feature state into a persistent (N, 12) matrix
+        
+        Column-wise assignments straight from the structure-of-arrays state,
+        matching RegionalAgent.get_state_vector feature for feature. Fills
+        self.state_mat unless another matrix (e.g. self.next_state_mat) is given.
+        """
+        mat = self.state_mat if out is None else out
+        resources, regions = self.resources, self.region_arrays
+        mat[:, 0] = resources.water / 2000.0
+        mat[:, 1] = resources.food / 2000.0
+        mat[:, 2] = resources.energy / 2000.0
+        mat[:, 3] = resources.land / 1000.0
+        mat[:, 4] = regions.population / 1000.0
+        mat[:, 5] = regions.development_level
+        mat[:, 6] = regions.stability
+        mat[:, 7] = regions.temperature / 50.0
+        mat[:, 8] = regions.rainfall / 200.0
+        mat[:, 9] = regions.disaster_risk
+        mat[:, 10] = [len(region.trade_partners) / 10.0 for region in self.regions.values()]
+        mat[:, 11] = regions.growth_rate * 100
+        np.clip(mat, 0.0, 1.0, out=mat)
+        return mat
+    
+    def _step_region(self, region_id: str, action_idx: int) -> Tuple[Dict, Dict, bool]:
+        """Record a region's experience for its applied action
+        
+        Returns the region state, the action record and the done flag for
+        the shared replay buffer.
+        """
+        region = self.regions[region_id]
+        agent = self.agents[region_id]
+        i = self._region_index[region_id]
+        reward = float(self.rewards[i])  # Computed for all regions in _begin_cycle
+        
+        # Store experience and learn: s and s' are the region's rows of the
+        # state matrices filled before and after the actions were applied
+        done = region.is_critical()
+        agent.learn(self.state_mat[i], action_idx, reward, self.next_state_mat[i], done, replay=False)
+        
+        action_record = {
+            'region_id': region_id,
+            'action': RegionalAgent.ACTION_NAMES[action_idx],
+            'reward': reward
+        }
+        return region.get_state_dict(), action_record, done
+    
+    def _update_q_table(self) -> float:
+        """One minibatch Bellman update of the shared Q-table from the pooled replay buffer"""
+        for agent in self.agents.values():
+            agent.dqn.decay_epsilon()
+        
+        buffer = self.replay_buffer
+        if len(buffer) < self.batch_size:
+            return 0.0
+        
+        idx = buffer.sample(self.batch_size, self.rng)
+        return q_update(self.q_table, buffer, idx, self.gamma, self.learning_rate)
+    
+    def _begin_cycle(self) -> Tuple[Dict[str, Any], List[str], np.ndarray, np.ndarray]:
+        """Natural updates, climatic events and batched action selection/application"""
         cycle_data = {
             'cycle': self.current_cycle,
             'timestamp': datetime.now().isoformat(),
@@ -209,97 +366,97 @@ class WorldSimulation:
             'actions': []
         }
         
+        # This cycle's randomness, pre-drawn in a few vectorized Generator calls
+        rng, n = self.rng, self.num_regions
+        event_draws = rng.random(3)
+        explore_draws = rng.random(n)
+        random_actions = rng.integers(0, len(RegionalAgent.ACTIONS), n)
+        trade_flips = rng.random((n, n))
+        
         # Update basic resources for all regions
-        for region_id, region in self.regions.items():
-            self._update_basic_resources(region)
+        self._update_basic_resources()
         
         # Apply climatic events
-        event = self._generate_climatic_event()
+        event = self._generate_climatic_event(event_draws)
         if event:
             self.event_history.append(event)
-            for region_id, region in self.regions.items():
-                event.apply(region)
+            self.events_total += 1
+            event.apply_vec(self.resources.water, self.resources.food, self.resources.energy,
+                            self.resources.land, self.region_arrays.population, event.affected_idx)
             cycle_data['events'].append({
                 'type': event.event_type,
                 'affected_regions': event.affected_regions,
                 'severity': event.severity
             })
         
-        # Agent decision making and resource allocation
-        for region_id, region in self.regions.items():
-            agent = self.agents[region_id]
-            state_before = region.resources.get_as_dict().copy()
-            
-            # Get agent action
-            action_idx, action_name = agent.decide_action(region.get_state_dict())
-            action_effects = RegionalAgent.ACTIONS[action_idx]
-            
-            # Apply action effects
-            if 'water' in action_effects:
-                region.resources.deplete(water=-action_effects['water'])
-            if 'food' in action_effects:
-                region.resources.deplete(food=-action_effects['food'])
-            if 'energy' in action_effects:
-                region.resources.deplete(energy=-action_effects['energy'])
-            if 'growth' in action_effects:
-                region.growth_rate += action_effects['growth']
-            if 'pop_growth' in action_effects:
-                region.population = int(region.population * (1 + action_effects['pop_growth']))
-            if 'dev_increase' in action_effects:
-                region.development_level = min(1.0, region.development_level + action_effects['dev_increase'])
-            
-            # Calculate reward
-            state_after = region.resources.get_as_dict()
-            reward = agent.calculate_reward(state_before, state_after, region.stability, region.population)
-            
-            # Store experience and learn
-            state_vec = agent.get_state_vector(region.get_state_dict())
-            next_state_vec = agent.get_state_vector(region.get_state_dict())
-            done = region.is_critical()
-            agent.learn(state_vec, action_idx, reward, next_state_vec, done)
-            
-            cycle_data['regions'][region_id] = region.get_state_dict()
-            cycle_data['actions'].append({
-                'region_id': region_id,
-                'action': action_name,
-                'reward': reward
-            })
+        # Agent decision making: observe every region into one (N, 12) batch,
+        # then a single batched action selection for all regions
+        region_ids = list(self.regions.keys())
+        agents = [self.agents[rid] for rid in region_ids]
+        self._fill_state_matrix()
+        epsilons = np.array([agent.dqn.epsilon for agent in agents])
+        actions = select_actions(self.q_table, epsilons, self.state_mat,
+                                 explore_draws=explore_draws, random_actions=random_actions)
         
-        # Execute trades
-        for region_a_id, trade_partners in [(rid, self.trade_network.get_trading_partners(rid)) 
-                                           for rid in self.regions.keys()]:
-            for region_b_id, strength in trade_partners.items():
-                if region_a_id < region_b_id:  # Avoid duplicate trades
-                    if np.random.random() > 0.5:  # 50% chance to trade each cycle
-                        region_a = self.regions[region_a_id]
-                        region_b = self.regions[region_b_id]
-                        self.trade_network.execute_trade(region_a, region_b, strength)
+        # Resource allocation, then every region's post-action observation s'
+        self._apply_actions(actions)
+        self._fill_state_matrix(self.next_state_mat)
+        
+        # Rewards for every region in one kernel call (only the post-action
+        # resources enter the reward)
+        resources = self.resources
+        compute_rewards(resources.water, resources.food, resources.energy,
+                        self.region_arrays.stability, self.region_arrays.population, self.rewards)
+        
+        return cycle_data, region_ids, actions, trade_flips
+    
+    def _end_cycle(self, cycle_data: Dict[str, Any], region_ids: List[str], actions: np.ndarray,
+                   trade_flips: np.ndarray):
+        """Per-region experience, shared Q-table update, trades and bookkeeping"""
+        dones = np.empty(self.num_regions, dtype=np.bool_)
+        for i, (region_id, action_idx) in enumerate(zip(region_ids, actions.tolist())):
+            region_state, action_record, dones[i] = self._step_region(region_id, action_idx)
+            cycle_data['regions'][region_id] = region_state
+            cycle_data['actions'].append(action_record)
+        
+        # Pool every region's transition, then a single minibatch update for all of them
+        self.replay_buffer.extend(np.arange(self.num_regions), self.state_mat, actions,
+                                  self.rewards, self.next_state_mat, dones)
+        self._update_q_table()
+        
+        # Execute trades: 50% chance for each trading pair every cycle
+        self.trade_network.execute_trades(self.resources, trade_flips > 0.5)
         
         self.cycle_history.append(cycle_data)
-        self.current_cycle += 1
+        self._snapshot_regions()
+    
+    def step(self) -> Dict[str, Any]:
+        """Execute one simulation cycle"""
+        cycle_data, region_ids, actions, trade_flips = self._begin_cycle()
+        self._end_cycle(cycle_data, region_ids, actions, trade_flips)
         
+        # Advanced only once the snapshot exists, so per-cycle response caches
+        # never pair a new cycle number with the previous cycle's state
+        self.current_cycle += 1
         return cycle_data
     
+    def _snapshot_regions(self):
+        """Rebuild the serialized region states; regions only change inside step()"""
+        self._regions_snapshot = {rid: region.get_state_dict() for rid, region in self.regions.items()}
+    
+    def get_regions(self) -> Dict[str, Dict]:
+        """Get all region states as of the end of the last cycle"""
+        return self._regions_snapshot
+    
     def get_world_state(self) -> Dict[str, Any]:
         """Get current complete world state"""
         return {
             'cycle': self.current_cycle,
-            'regions': {rid: region.get_state_dict() for rid, region in self.regions.items()},
+            'regions': self._regions_snapshot,
             'trade_network': {
-                'edges': [
-                    {'source': u, 'target': v, 'weight': data.get('weight', 0.5)}
-                    for u, v, data in self.trade_network.trade_graph.edges(data=True)
-                ]
+                'edges': self.trade_network.edges()
             },
-            'events': [
-                {
-                    'type': event.event_type,
-                    'affected_regions': event.affected_regions,
-                    'severity': event.severity,
-                    'timestamp': event.timestamp.isoformat()
-                }
-                for event in self.event_history[-10:]  # Last 10 events
-            ]
+            'events': [event.to_dict() for event in recent_items(self.event_history, 10)]  # Last 10 events
         }
     
     def get_statistics(self) -> Dict[str, Any]:
@@ -312,7 +469,7 @@ class WorldSimulation:
         collapsed = sum(1 for region in self.regions.values() if region.is_critical())
         
         # Average agent learning progress
-        avg_learning = np.mean([len(agent.reward_history) for agent in self.agents.values()])
+        avg_learning = np.mean([agent.reward_count for agent in self.agents.values()])
         
         return {
             'cycle': self.current_cycle,
@@ -321,6 +478,6 @@ class WorldSimulation:
             'avg_development': float(avg_dev),
             'collapsed_regions': collapsed,
             'active_regions': self.num_regions - collapsed,
-            'trade_connections': self.trade_network.trade_graph.number_of_edges(),
+            'trade_connections': self.trade_network.num_edges(),
             'avg_learning_steps': float(avg_learning)
         }
@@ -3,12 +3,14 @@ WorldSim FastAPI Application
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.api.routes import router
 
 app = FastAPI(
     title="WorldSim API",
     description="Adaptive Resource Scarcity & Agent Strategy Simulator",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware